@@ -1,17 +1,20 @@
 import os
 import json
+import asyncio
 import numpy as np
 import xml.etree.ElementTree as ET
 
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, compress
 from pathlib import Path
 from typing import Union
 
-from trame.app import get_server
+from trame.app import asynchronous, get_server
 from trame.decorators import TrameApp, life_cycle
 from trame.ui.vuetify import SinglePageWithDrawerLayout
 
 from trame.widgets import vuetify as v2, html, client
-from trame.widgets import paraview as pvWidgets
 from trame.widgets import grid
 
 from trame_server.core import Server
@@ -31,8 +34,6 @@ from quickview.utilities import EventType
 
 from quickview.view_manager import ViewManager
 
-from paraview.simple import ImportPresets, GetLookupTableNames
-
 
 # -----------------------------------------------------------------------------
 # trame setup
@@ -80,24 +81,129 @@ save_state_keys = [
 ]
 
 
-try:
-    existing = GetLookupTableNames()
-    presdir = os.path.join(os.path.dirname(__file__), "presets")
-    presets = os.listdir(path=presdir)
-    for preset in presets:
-        prespath = os.path.abspath(os.path.join(presdir, preset))
-        if os.path.isfile(prespath):
-            name = ET.parse(prespath).getroot()[0].attrib["name"]
-            if name not in existing:
-                print("Importing non existing preset ", name)
-                ImportPresets(prespath)
-            cvd.append({"text": name.title(), "value": name})
-except Exception as e:
-    print("Error loading presets :", e)
+def _preset_cache_file():
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(cache_dir) / "quickview" / "preset_cache.json"
+
+
+_presets_loader = None
+
+
+def _load_presets():
+    # Generator that imports one preset file per step so the import can be
+    # spread over the event loop; every step runs on the main thread
+    from paraview.simple import ImportPresets, GetLookupTableNames
+
+    try:
+        existing = GetLookupTableNames()
+        presdir = os.path.join(os.path.dirname(__file__), "presets")
+        # Preset names are cached against file mtime/size to avoid
+        # parsing every XML file on startup
+        cache_file = _preset_cache_file()
+        try:
+            cache = json.loads(cache_file.read_text())
+        except Exception:
+            cache = {}
+        updated = {}
+        presets = os.listdir(path=presdir)
+        for preset in presets:
+            prespath = os.path.abspath(os.path.join(presdir, preset))
+            if os.path.isfile(prespath):
+                stat = os.stat(prespath)
+                entry = cache.get(prespath)
+                if (
+                    entry is not None
+                    and entry["mtime"] == stat.st_mtime
+                    and entry["size"] == stat.st_size
+                ):
+                    name = entry["name"]
+                else:
+                    name = ET.parse(prespath).getroot()[0].attrib["name"]
+                updated[prespath] = {
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "name": name,
+                }
+                if name not in existing:
+                    print("Importing non existing preset ", name)
+                    ImportPresets(prespath)
+                cvd.append({"text": name.title(), "value": name})
+                yield
+        if updated != cache:
+            try:
+                os.makedirs(cache_file.parent, exist_ok=True)
+                cache_file.write_text(json.dumps(updated, indent=2))
+            except OSError as e:
+                print("Unable to write preset cache :", e)
+    except Exception as e:
+        print("Error loading presets :", e)
+
+
+# Number of variable search results kept by each app
+SEARCH_CACHE_SIZE = 128
+
+
+def build_search_index(names):
+    """
+    Join lowercased names into a single NUL separated string so a search
+    is a handful of str.find calls instead of a Python loop over names.
+    Returns the joined string and the start offset of every name.
+    """
+    lowered = [name.lower() for name in names]
+    haystack = "\x00" + "\x00".join(lowered) + "\x00"
+    # Offsets come from the lowercased names, which may differ in length
+    offsets = list(accumulate((len(name) + 1 for name in lowered[:-1]), initial=1))
+    return (haystack, offsets if len(lowered) > 0 else [])
+
+
+def search_index(index, needle):
+    """
+    Returns the indices of names containing the lowercased needle.
+    """
+    haystack, offsets = index
+    hits = []
+    pos = haystack.find(needle)
+    while pos != -1:
+        idx = bisect_right(offsets, pos) - 1
+        hits.append(idx)
+        if idx + 1 == len(offsets):
+            break
+        # Continue from the next name to report every name once
+        pos = haystack.find(needle, offsets[idx + 1])
+    return hits
+
+
+def _get_presets_loader():
+    global _presets_loader
+    if _presets_loader is None:
+        _presets_loader = _load_presets()
+    return _presets_loader
+
+
+def finish_loading_presets():
+    # Import any remaining presets, needed before a preset is applied
+    for _ in _get_presets_loader():
+        pass
+
+
+async def load_presets_async():
+    # ImportPresets is expensive, import presets one at a time between
+    # other events so the UI is not blocked; cvd is populated as presets
+    # become available
+    for _ in _get_presets_loader():
+        await asyncio.sleep(0)
 
 
 @TrameApp()
 class EAMApp:
+    # Attribute names used for each kind of variable :
+    # (variable list, selection state, filtered indices, search index)
+    _var_kinds = {
+        "2D": ("vars2D", "vars2Dstate", "ind2d", "_vars2D_index"),
+        "3Dm": ("vars3Dm", "vars3Dmstate", "ind3dm", "_vars3Dm_index"),
+        "3Di": ("vars3Di", "vars3Distate", "ind3di", "_vars3Di_index"),
+    }
+
     def __init__(
         self,
         source: EAMVisSource = None,
@@ -110,9 +216,15 @@ class EAMApp:
         ctrl = server.controller
 
         self._ui = None
+        self._dirty_pending = set()
+        self._dirty_flush = None
+        # Search results keyed by (kind, needle), least recently used first
+        self._search_cache = OrderedDict()
 
         self.workdir = workdir
         self.server = server
+        from trame.widgets import paraview as pvWidgets
+
         pvWidgets.initialize(server)
 
         self.source = source
@@ -135,18 +247,20 @@ class EAMApp:
         state.cmaps = ["1"]
         state.layout = []
         state.variables = []
-        state.ccardscolor = [None] * len(
-            source.vars2D + source.vars3Di + source.vars3Dm
+        state.ccardscolor = [None] * (
+            len(source.vars2D) + len(source.vars3Di) + len(source.vars3Dm)
         )
         state.varcolor = []
         state.uselogscale = []
         state.invert = []
         state.varmin = []
         state.varmax = []
+        state.loading_vars = False
 
         ctrl.view_update = self.viewmanager.reset_views
         ctrl.view_reset_camera = self.viewmanager.reset_camera
         ctrl.on_server_ready.add(ctrl.view_update)
+        ctrl.on_server_ready.add_task(self._import_presets)
         server.trigger_name(ctrl.view_reset_camera)
 
         state.colormaps = noncvd
@@ -174,6 +288,12 @@ class EAMApp:
     def _tauri_show(self, **_):
         os.write(1, "tauri-client-ready\n".encode())
 
+    async def _import_presets(self, **_):
+        await load_presets_async()
+        # The color map list may have been built from a partial cvd
+        with self.state as state:
+            self.update_available_color_maps(state.cmaps)
+
     def init_app_configuration(self):
         source = self.source
         with self.state as state:
@@ -183,9 +303,9 @@ class EAMApp:
             state.vars2Dstate = [False] * len(source.vars2D)
             state.vars3Dmstate = [False] * len(source.vars3Dm)
             state.vars3Distate = [False] * len(source.vars3Di)
-        self.vars2Dstate = np.array([False] * len(source.vars2D))
-        self.vars3Dmstate = np.array([False] * len(source.vars3Dm))
-        self.vars3Distate = np.array([False] * len(source.vars3Di))
+        self.vars2Dstate = np.zeros(len(source.vars2D), dtype=bool)
+        self.vars3Dmstate = np.zeros(len(source.vars3Dm), dtype=bool)
+        self.vars3Distate = np.zeros(len(source.vars3Di), dtype=bool)
 
     def update_state_from_source(self):
         source = self.source
@@ -198,6 +318,11 @@ class EAMApp:
             state.vars3Di = source.vars3Di
             state.vars3Dm = source.vars3Dm
             state.pipeline_valid = source.valid
+        # Search indices for case insensitive variable search
+        self._search_cache.clear()
+        self._vars2D_index = build_search_index(source.vars2D)
+        self._vars3Dm_index = build_search_index(source.vars3Dm)
+        self._vars3Di_index = build_search_index(source.vars3Di)
 
     def update_state_from_config(self, initstate):
         source = self.source
@@ -207,10 +332,12 @@ class EAMApp:
             state.vars3Dm = source.vars3Dm
             state.update(initstate)
 
-            selection = state.variables
-            selection2D = np.isin(state.vars2D, selection).tolist()
-            selection3Dm = np.isin(state.vars3Dm, selection).tolist()
-            selection3Di = np.isin(state.vars3Di, selection).tolist()
+            # Variable names are strings, for which np.isin degrades to a
+            # pairwise comparison; a set gives hashed lookups instead
+            selection = set(state.variables)
+            selection2D = [var in selection for var in state.vars2D]
+            selection3Dm = [var in selection for var in state.vars3Dm]
+            selection3Di = [var in selection for var in state.vars3Di]
             state.vars2Dstate = selection2D
             state.vars3Dmstate = selection3Dm
             state.vars3Distate = selection3Di
@@ -223,8 +350,8 @@ class EAMApp:
         self.load_variables()
 
     def generate_state(self):
-        all = self.state.to_dict()
-        to_export = {k: all[k] for k in save_state_keys}
+        # Only read the exported keys instead of copying the whole state
+        to_export = {k: self.state[k] for k in save_state_keys}
         # with open(os.path.join(self.workdir, "state.json"), "w") as outfile:
         return to_export
 
@@ -249,76 +376,105 @@ class EAMApp:
             self.init_app_configuration()
             self.update_state_from_source()
 
-    def load_variables(self):
-        s2d = []
-        s3dm = []
-        s3di = []
-        if len(self.state.vars2D) > 0:
-            v2d = np.array(self.state.vars2D)
-            f2d = np.array(self.state.vars2Dstate)
-            s2d = v2d[f2d].tolist()
-        if len(self.state.vars3Dm) > 0:
-            v3dm = np.array(self.state.vars3Dm)
-            f3dm = np.array(self.state.vars3Dmstate)
-            s3dm = v3dm[f3dm].tolist()
-        if len(self.state.vars3Di) > 0:
-            v3di = np.array(self.state.vars3Di)
-            f3di = np.array(self.state.vars3Distate)
-            s3di = v3di[f3di].tolist()
+    def get_selected_variables(self):
+        s2d = list(compress(self.state.vars2D, self.state.vars2Dstate))
+        s3dm = list(compress(self.state.vars3Dm, self.state.vars3Dmstate))
+        s3di = list(compress(self.state.vars3Di, self.state.vars3Distate))
         print(s2d, s3di, s3dm)
-        self.source.LoadVariables(s2d, s3dm, s3di)
+        return (s2d, s3dm, s3di)
 
-        vars = s2d + s3dm + s3di
+    def load_variables(self):
+        s2d, s3dm, s3di = self.get_selected_variables()
+        self.source.LoadVariables(s2d, s3dm, s3di)
+        self.update_variables(s2d + s3dm + s3di)
+
+    @asynchronous.task
+    async def load_variables_async(self):
+        # Used from the UI, the loading state reaches the client before the
+        # reader is updated. ParaView's server manager is not thread safe,
+        # so the update itself still runs on the event loop.
+        s2d, s3dm, s3di = self.get_selected_variables()
+        with self.state as state:
+            state.loading_vars = True
+        try:
+            await self.server.network_completion
+            self.source.LoadVariables(s2d, s3dm, s3di)
+            self.update_variables(s2d + s3dm + s3di)
+        finally:
+            with self.state as state:
+                state.loading_vars = False
+
+    def update_variables(self, vars):
+        nvars = len(vars)
+        finish_loading_presets()
 
         # Tracking variables to control camera and color properties
+        # These are sent to the client as JSON and updated per index,
+        # so they are kept as plain lists
         with self.state as state:
+            default_cmap = state.colormaps[0]["value"]
             state.variables = vars
-            state.varcolor = [state.colormaps[0]["value"]] * len(vars)
-            state.uselogscale = [False] * len(vars)
-            state.invert = [False] * len(vars)
-            state.varmin = [np.nan] * len(vars)
-            state.varmax = [np.nan] * len(vars)
+            state.varcolor = [default_cmap] * nvars
+            state.uselogscale = [False] * nvars
+            state.invert = [False] * nvars
+            state.varmin = [np.nan] * nvars
+            state.varmax = [np.nan] * nvars
 
             self.viewmanager.create_or_update_views()
 
-    def apply_colormap(self, index, type, value):
+    def mark_dirty(self, *names):
+        # Coalesce dirty notifications from rapid UI events into one flush
+        self._dirty_pending.update(names)
+        if self._dirty_flush is None:
+            loop = asyncio.get_running_loop()
+            self._dirty_flush = loop.call_later(0.05, self._flush_dirty)
+
+    def _flush_dirty(self):
+        self._dirty_flush = None
+        pending = self._dirty_pending
+        self._dirty_pending = set()
         with self.state as state:
-            if type == EventType.COL.value:
-                state.varcolor[index] = value
-                state.dirty("varcolor")
-            elif type == EventType.LOG.value:
-                state.uselogscale[index] = value
-                state.dirty("uselogscale")
-            elif type == EventType.INV.value:
-                state.invert[index] = value
-                state.dirty("invert")
-            self.viewmanager.apply_colormap(index, type, value)
+            state.dirty(*pending)
+
+    def apply_colormap(self, index, type, value):
+        state = self.state
+        if type == EventType.COL.value:
+            state.varcolor[index] = value
+            self.mark_dirty("varcolor")
+        elif type == EventType.LOG.value:
+            state.uselogscale[index] = value
+            self.mark_dirty("uselogscale")
+        elif type == EventType.INV.value:
+            state.invert[index] = value
+            self.mark_dirty("invert")
+        self.viewmanager.apply_colormap(index, type, value)
 
     def update_scalar_bars(self, event):
         self.viewmanager.update_scalar_bars(event)
 
     def update_available_color_maps(self, event):
-        with self.state as state:
-            if len(event) == 0:
-                state.colormaps = noncvd
-            elif len(event) == 2:
-                state.colormaps = cvd + noncvd
-            elif "0" in event:
-                state.colormaps = cvd
-            elif "1" in event:
-                state.colormaps = noncvd
+        state = self.state
+        if len(event) == 0:
+            state.colormaps = noncvd
+        elif len(event) == 2:
+            state.colormaps = cvd + noncvd
+        elif "0" in event:
+            # Presets may still be loading
+            state.colormaps = cvd if len(cvd) > 0 else noncvd
+        elif "1" in event:
+            state.colormaps = noncvd
 
     def update_view_color_properties(self, index, type, value):
-        with self.state as state:
-            if type.lower() == "min":
-                state.varmin[index] = value
-                state.dirty("varmin")
-            elif type.lower() == "max":
-                state.varmax[index] = value
-                state.dirty("varmax")
-            self.viewmanager.update_view_color_properties(
-                index, state.varmin[index], state.varmax[index]
-            )
+        state = self.state
+        if type.lower() == "min":
+            state.varmin[index] = value
+            self.mark_dirty("varmin")
+        elif type.lower() == "max":
+            state.varmax[index] = value
+            self.mark_dirty("varmax")
+        self.viewmanager.update_view_color_properties(
+            index, state.varmin[index], state.varmax[index]
+        )
 
     def reset_view_color_properties(self, index):
         self.viewmanager.reset_view_color_properties(index)
@@ -341,107 +497,72 @@ class EAMApp:
             elif dir.lower() == "right":
                 manager.move(0, 0)
 
-    def update_2D_variable_selection(self, index, event):
-        self.state.vars2Dstate[index] = event
-        self.state.dirty("vars2Dstate")
-        if self.ind2d is not None:
-            ind = self.ind2d[index]
-            self.vars2Dstate[ind] = event
+    def _update_variable_selection(self, kind, index, event):
+        _, state_name, ind_name, _ = self._var_kinds[kind]
+        filtered = getattr(self, ind_name)
+        selection = getattr(self, state_name)
+        ind = filtered[index] if filtered is not None else index
+        if selection[ind] == event:
+            return
+        self.state[state_name][index] = event
+        self.state.dirty(state_name)
+        selection[ind] = event
+
+    def _search_variables(self, kind, search):
+        vars_name, state_name, ind_name, index_name = self._var_kinds[kind]
+        all_vars = getattr(self.source, vars_name)
+        selection = getattr(self, state_name)
+        if search is None or len(search) == 0:
+            setattr(self, ind_name, None)
+            self.state[vars_name] = all_vars
+            self.state[state_name] = selection.tolist()
         else:
-            self.vars2Dstate[index] = event
+            key = (kind, search.lower())
+            filtered = self._search_cache.get(key)
+            if filtered is None:
+                filtered = search_index(getattr(self, index_name), key[1])
+                self._search_cache[key] = filtered
+                if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+            else:
+                self._search_cache.move_to_end(key)
+            setattr(self, ind_name, filtered)
+            self.state[vars_name] = [all_vars[idx] for idx in filtered]
+            self.state[state_name] = selection[filtered].tolist()
+        self.state.dirty(state_name)
+
+    def _clear_variables(self, kind):
+        _, state_name, _, _ = self._var_kinds[kind]
+        self.state[state_name] = [False] * len(self.state[state_name])
+        setattr(self, state_name, np.zeros(len(getattr(self, state_name)), dtype=bool))
+        self.state.dirty(state_name)
+
+    def update_2D_variable_selection(self, index, event):
+        self._update_variable_selection("2D", index, event)
 
     def update_3Dm_variable_selection(self, index, event):
-        self.state.vars3Dmstate[index] = event
-        self.state.dirty("vars3Dmstate")
-        if self.ind3dm is not None:
-            ind = self.ind3dm[index]
-            self.vars3Dmstate[ind] = event
-        else:
-            self.vars3Dmstate[index] = event
+        self._update_variable_selection("3Dm", index, event)
 
     def update_3Di_variable_selection(self, index, event):
-        self.state.vars3Distate[index] = event
-        self.state.dirty("vars3Distate")
-        if self.ind3di is not None:
-            ind = self.ind3di[index]
-            self.vars3Distate[ind] = event
-        else:
-            self.vars3Distate[index] = event
+        self._update_variable_selection("3Di", index, event)
 
     def search_2D_variables(self, search: str):
-        if search is None or len(search) == 0:
-            filtVars = self.source.vars2D
-            self.ind2d = None
-            self.state.vars2D = self.source.vars2D
-            self.state.vars2Dstate = self.vars2Dstate.tolist()
-            self.state.dirty("vars2Dstate")
-        else:
-            filtered = [
-                (idx, var)
-                for idx, var in enumerate(self.source.vars2D)
-                if search.lower() in var.lower()
-            ]
-            filtVars = [var for (_, var) in filtered]
-            self.ind2d = [idx for (idx, _) in filtered]
-        if self.ind2d is not None:
-            self.state.vars2D = list(filtVars)
-            self.state.vars2Dstate = self.vars2Dstate[self.ind2d].tolist()
-            self.state.dirty("vars2Dstate")
+        self._search_variables("2D", search)
 
     def search_3Dm_variables(self, search: str):
-        if search is None or len(search) == 0:
-            filtVars = self.source.vars3Dm
-            self.ind3dm = None
-            self.state.vars3Dm = self.source.vars3Dm
-            self.state.vars3Dmstate = self.vars3Dmstate.tolist()
-            self.state.dirty("vars3Dmstate")
-        else:
-            filtered = [
-                (idx, var)
-                for idx, var in enumerate(self.source.vars3Dm)
-                if search.lower() in var.lower()
-            ]
-            filtVars = [var for (_, var) in filtered]
-            self.ind3dm = [idx for (idx, _) in filtered]
-        if self.ind3dm is not None:
-            self.state.vars3Dm = list(filtVars)
-            self.state.vars3Dmstate = self.vars3Dmstate[self.ind3dm].tolist()
-            self.state.dirty("vars3Dmstate")
+        self._search_variables("3Dm", search)
 
     def search_3Di_variables(self, search: str):
-        if search is None or len(search) == 0:
-            filtVars = self.source.vars3Di
-            self.ind3di = None
-            self.state.vars3Di = self.source.vars3Di
-            self.state.vars3Distate = self.vars3Distate.tolist()
-            self.state.dirty("vars3Distate")
-        else:
-            filtered = [
-                (idx, var)
-                for idx, var in enumerate(self.source.vars3Di)
-                if search.lower() in var.lower()
-            ]
-            filtVars = [var for (_, var) in filtered]
-            self.ind3di = [idx for (idx, _) in filtered]
-        if self.ind3dm is not None:
-            self.state.vars3Di = list(filtVars)
-            self.state.vars3Distate = self.vars3Distate[self.ind3di].tolist()
-            self.state.dirty("vars3Distate")
+        self._search_variables("3Di", search)
 
     def clear_2D_variables(self):
-        self.state.vars2Dstate = [False] * len(self.state.vars2Dstate)
-        self.vars2Dstate = np.array([False] * len(self.vars2Dstate))
-        self.state.dirty("vars2Dstate")
+        self._clear_variables("2D")
 
     def clear_3Dm_variables(self):
-        self.state.vars3Dmstate = [False] * len(self.state.vars3Dmstate)
-        self.vars3Dmstate = np.array([False] * len(self.vars3Dmstate))
-        self.state.dirty("vars3Dmstate")
+        self._clear_variables("3Dm")
 
     def clear_3Di_variables(self):
-        self.state.vars3Distate = [False] * len(self.state.vars3Distate)
-        self.vars3Distate = np.array([False] * len(self.vars3Distate))
-        self.state.dirty("vars3Distate")
+        self._clear_variables("3Di")
 
     def start(self, **kwargs):
         """Initialize the UI and start the server for GeoTrame."""
@@ -461,7 +582,7 @@ class EAMApp:
                         self.server,
                         load_data=self.load_data,
                         load_state=self.load_state,
-                        load_variables=self.load_variables,
+                        load_variables=self.load_variables_async,
                         update_available_color_maps=self.update_available_color_maps,
                         update_scalar_bars=self.update_scalar_bars,
                         generate_state=self.generate_state,
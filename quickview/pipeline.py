@@ -45,6 +45,9 @@ class EAMVisSource:
 
         self.lev = 0
         self.ilev = 0
+        # Last applied time index and clipping ranges
+        self.t_index = None
+        self.clip = None
 
         # List of all available variables
         self.vars2D = []
@@ -97,6 +100,11 @@ class EAMVisSource:
         if not self.valid:
             return
 
+        clip = (tuple(cliplong), tuple(cliplat))
+        if self.clip == clip:
+            return
+        self.clip = clip
+
         extract = FindSource("DataExtract")
         extract.LongitudeRange = cliplong
         extract.LatitudeRange = cliplat
@@ -135,6 +143,10 @@ class EAMVisSource:
         if not self.valid:
             return
 
+        if self.t_index == t_index:
+            return
+        self.t_index = t_index
+
         time = self.timestamps[t_index]
         tk = GetTimeKeeper()
         tk.Time = time
@@ -218,12 +230,14 @@ class EAMVisSource:
             tk = GetTimeKeeper()
             self.timestamps = np.array(tk.TimestepValues).tolist()
             tk.Time = tk.TimestepValues[0]
+            self.t_index = 0
 
             extract = EAMTransformAndExtract(
                 registrationName="DataExtract", Input=self.data
             )
             extract.LongitudeRange = [-180.0, 180.0]
             extract.LatitudeRange = [-90.0, 90.0]
+            self.clip = None
             # meridian = EAMCenterMeridian(
             #    registrationName="CenterMeridian", Input=OutputPort(extract, 0)
             # )
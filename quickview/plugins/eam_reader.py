@@ -7,6 +7,19 @@ from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
 from vtkmodules.vtkIOLegacy import vtkUnstructuredGridWriter
 from paraview import print_error
 
+import os
+
+# Upper bound in bytes of the chunk cache of each 3D variable. The cache
+# is allocated per variable as its chunks are read, so the memory used
+# grows with the number of 3D variables read.
+VAR_CHUNK_CACHE_MAX = 64 * 1024 * 1024
+
+# Number of fill-masked variable slices EAMSliceSource keeps in memory,
+# 0 disables the cache. The oldest slice is evicted first, so the cache
+# serves toggling variables and going back to recently shown levels or
+# timesteps; a loop over more slices than it holds is always read again.
+SLICE_CACHE_SIZE = int(os.environ.get("EAM_SLICE_CACHE_SIZE", "32"))
+
 try:
     import netCDF4
     import numpy as np
@@ -51,7 +64,6 @@ class VarMeta:
         self.name = name
         self.type = None
         self.transpose = False
-        self.fillval = np.nan
 
         dims = info.dimensions
 
@@ -69,57 +81,107 @@ class VarMeta:
                 self.transpose = True
 
 
+def fill_masked(data):
+    """
+    Sets NaNs where netCDF4 masked fill values while reading, masked integer
+    data is converted to float
+    """
+    if np.ma.isMaskedArray(data) and not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+    return np.ma.filled(data, np.nan)
+
+
+def read_timestep(var, timeInd, transpose=False):
+    """
+    Reads a single timestep of a netCDF variable as a flat array. The fill
+    value mask computed by netCDF4 while reading is used to set NaNs.
+    """
+    data = fill_masked(var[timeInd, ...])
+    if transpose:
+        # Single strided copy into (lev, ncol) order
+        data = np.ascontiguousarray(data.T)
+    return data.ravel()
+
+
+def read_timesteps(vardata, varmetas, timeInd):
+    """
+    Reads a single timestep of each of the given variables. Results are in
+    the order of varmetas.
+    """
+    return [
+        read_timestep(vardata[varmeta.name], timeInd, varmeta.transpose)
+        for varmeta in varmetas
+    ]
+
+
+def set_var_chunk_cache(var):
+    """
+    Sizes the chunk cache of a variable to hold the chunks covering one
+    timestep, so reading a timestep does not decompress a chunk twice.
+    """
+    chunks = var.chunking()
+    if chunks == "contiguous":
+        return
+    nchunks = 1
+    for size, chunk in zip(var.shape[1:], chunks[1:]):
+        nchunks *= -(-size // chunk)
+    chunk_bytes = var.dtype.itemsize * int(np.prod(chunks))
+    nchunks = max(1, min(nchunks, VAR_CHUNK_CACHE_MAX // chunk_bytes))
+    # Slots should exceed the number of cached chunks, preferably odd
+    var.set_var_chunk_cache(nchunks * chunk_bytes, 2 * nchunks + 1, 0.75)
+
+
 def compare(data, arrays, dim):
     ref = data[arrays[0]][:].flatten()
     if len(ref) != dim:
         raise Exception(
             "Length of hya_/hyb_ variable does not match the corresponding dimension"
         )
-    for i, array in enumerate(arrays[1:], start=1):
-        comp = data[array][:].flatten()
-        if not np.array_equal(ref, comp):
+    for array in arrays[1:]:
+        if not np.array_equal(ref, data[array][:].flatten()):
             return None
     return ref
 
 
+def hybrid_pressure(hyai, hybi):
+    # Pressure at the hybrid levels in hPa, with the unit conversion folded
+    # into the constants to avoid temporaries
+    ldata = hyai * (EAMConstants.P0 * 0.01)
+    ldata += hybi * (EAMConstants.PS0 * 0.01)
+    return ldata
+
+
 def FindSpecialVariable(data, lev, hya, hyb):
     dim = data.dimensions.get(lev, None)
     if dim is None:
         raise Exception(f"{lev} not found in dimensions")
     dim = dim.size
-    var = np.array(list(data.variables.keys()))
+    var = data.variables
 
     if lev in var:
         lev = data[lev][:].flatten()
         return lev
 
-    from numpy.core.defchararray import find
-
-    _hyai = var[find(var, hya) != -1]
-    _hybi = var[find(var, hyb) != -1]
+    _hyai = [name for name in var if hya in name]
+    _hybi = [name for name in var if hyb in name]
     if len(_hyai) != len(_hybi):
         raise Exception(f"Unmatched pair of hya and hyb variables found")
 
-    p0 = EAMConstants.P0
-    ps0 = EAMConstants.PS0
-
     if len(_hyai) == 1:
         hyai = data[_hyai[0]][:].flatten()
-        hybi = data[_hyai[1]][:].flatten()
+        hybi = data[_hybi[0]][:].flatten()
         if not (len(hyai) == dim and len(hybi) == dim):
             raise Exception(
                 f"Lengths of arrays for hya_ and hyb_ variables do not match"
             )
-        ldata = ((hyai * p0) + (hybi * ps0)) / 100.0
-        return ldata
+        return hybrid_pressure(hyai, hybi)
     else:
         hyai = compare(data, _hyai, dim)
         hybi = compare(data, _hybi, dim)
         if hyai is None or hybi is None:
             raise Exception(f"Values within hya_ and hyb_ arrays do not match")
         else:
-            ldata = ((hyai * p0) + (hybi * ps0)) / 100.0
-            return ldata
+            return hybrid_pressure(hyai, hybi)
 
 
 # ------------------------------------------------------------------------------
@@ -139,6 +201,20 @@ def createModifiedCallback(anobject):
     return _markmodified
 
 
+def createSelectionCallback(anobject):
+    import weakref
+
+    weakref_obj = weakref.ref(anobject)
+    anobject = None
+
+    def _resetenabled(*args, **kwars):
+        o = weakref_obj()
+        if o is not None:
+            o._enabled = None
+
+    return _resetenabled
+
+
 @smproxy.reader(
     name="EAMSource",
     label="EAM Data Reader",
@@ -177,6 +253,8 @@ class EAMSource(VTKPythonAlgorithmBase):
         )
         self._DataFileName = None
         self._ConnFileName = None
+        self._vardata = None
+        self._meshdata = None
         # Variables for dimension sliders
         self._time = 0
         self._lev = 0
@@ -187,6 +265,7 @@ class EAMSource(VTKPythonAlgorithmBase):
         self._vars3Di = []
         self._vars3Dm = []
         self._timeSteps = []
+        self._timeStepsArr = []
 
         # vtkDataArraySelection to allow users choice for fields
         # to fetch from the netCDF data set
@@ -205,6 +284,59 @@ class EAMSource(VTKPythonAlgorithmBase):
 
         # Storing Area as FieldData if available in file
         self._areavar = False
+        # Numpy buffers (offsets, connectivity) backing the cell arrays of
+        # all outputs
+        self._cell_buffers = None
+        # Points and cells of each output, reused across timesteps
+        self._grid_cache = {}
+
+    # Dataset handles are kept open across requests and closed when
+    # either file changes
+    def _get_vardata(self):
+        if self._vardata is None:
+            self._vardata = netCDF4.Dataset(self._DataFileName, "r")
+            # Fill values are masked by netCDF4 while decoding
+            self._vardata.set_auto_mask(True)
+        return self._vardata
+
+    def _get_meshdata(self):
+        if self._meshdata is None:
+            self._meshdata = netCDF4.Dataset(self._ConnFileName, "r")
+        return self._meshdata
+
+    def _close(self):
+        if self._vardata is not None:
+            self._vardata.close()
+            self._vardata = None
+        if self._meshdata is not None:
+            self._meshdata.close()
+            self._meshdata = None
+
+    def __del__(self):
+        self._close()
+
+    def _update_cell_buffers(self, ncells):
+        if self._cell_buffers is not None and len(self._cell_buffers[0]) == ncells + 1:
+            return
+        idtype = numpy_support.ID_TYPE_CODE
+        offsets = np.arange(ncells + 1, dtype=idtype)
+        offsets *= 4
+        cells = np.arange(ncells * 4, dtype=idtype)
+        self._cell_buffers = (offsets, cells)
+
+    def _get_cells(self, ncells):
+        # VTK wraps slices of the shared buffers without a copy, the
+        # buffers are kept alive by the reader
+        offsets, cells = self._cell_buffers
+        vtk_offsets = numpy_support.numpy_to_vtkIdTypeArray(
+            offsets[: ncells + 1], deep=False
+        )
+        vtk_cells = numpy_support.numpy_to_vtkIdTypeArray(
+            cells[: ncells * 4], deep=False
+        )
+        cellArray = vtkCellArray()
+        cellArray.SetData(vtk_offsets, vtk_cells)
+        return cellArray
 
     # Method to clear all the variable names
     def _clear(self):
@@ -212,13 +344,15 @@ class EAMSource(VTKPythonAlgorithmBase):
         self._vars2D.clear()
         self._vars3Di.clear()
         self._vars3Dm.clear()
+        self._timeSteps.clear()
 
     def _populate_variable_metadata(self):
         if self._DataFileName is None:
             return
-        vardata = netCDF4.Dataset(self._DataFileName, "r")
+        vardata = self._get_vardata()
         for name, info in vardata.variables.items():
-            if "ncol_d" in info.dimensions:
+            dims = set(info.dimensions)
+            if not (dims == dims1 or dims == dims2 or dims == dims3m or dims == dims3i):
                 continue
             varmeta = VarMeta(name, info)
             if varmeta.type == VarType._1D:
@@ -231,20 +365,17 @@ class EAMSource(VTKPythonAlgorithmBase):
             elif varmeta.type == VarType._3Di:
                 self._vars3Di.append(varmeta)
                 self._vars3Diarr.AddArray(name)
+                set_var_chunk_cache(info)
             elif varmeta.type == VarType._3Dm:
                 self._vars3Dm.append(varmeta)
                 self._vars3Dmarr.AddArray(name)
-            try:
-                fillval = info.getncattr("_FillValue")
-                varmeta.fillval = fillval
-            except Exception as e:
-                traceback.print_exc()
-                pass
+                set_var_chunk_cache(info)
         self._vars2Darr.DisableAllArrays()
         self._vars3Diarr.DisableAllArrays()
         self._vars3Dmarr.DisableAllArrays()
         timesteps = vardata["time"][:].data.flatten()
         self._timeSteps.extend(timesteps)
+        self._timeStepsArr = np.asarray(self._timeSteps)
         self.timeDim = vardata.dimensions["time"].size
         self.ilevDim = vardata.dimensions["ilev"].size
         self.levDim = vardata.dimensions["lev"].size
@@ -252,6 +383,8 @@ class EAMSource(VTKPythonAlgorithmBase):
     def SetDataFileName(self, fname):
         if fname is not None and fname != "None":
             if fname != self._DataFileName:
+                self._close()
+                self._grid_cache.clear()
                 self._DataFileName = fname
                 self._clear()
                 self._populate_variable_metadata()
@@ -259,6 +392,8 @@ class EAMSource(VTKPythonAlgorithmBase):
 
     def SetConnFileName(self, fname):
         if fname != self._ConnFileName:
+            self._close()
+            self._grid_cache.clear()
             self._ConnFileName = fname
             self.Modified()
 
@@ -303,16 +438,83 @@ class EAMSource(VTKPythonAlgorithmBase):
         return super().RequestUpdateExtent(request, inInfo, outInfo)
 
     def GetTimeIndex(self, time):
-        timeInd = 0
-        if self._timeSteps != None and len(self._timeSteps) > 1:
-            for t in self._timeSteps[1:]:
-                if time == t:
-                    break
-                else:
-                    timeInd = timeInd + 1
-            return timeInd
+        # Time values are sorted, pick the first step at or after the
+        # requested time
+        nsteps = len(self._timeStepsArr)
+        if nsteps > 1:
+            return min(int(np.searchsorted(self._timeStepsArr, time)), nsteps - 1)
         return 0
 
+    # Points and cells only depend on the connectivity file and the
+    # vertical levels, so they are built once and reused for every timestep
+    def _build_grids(self):
+        meshdata = self._get_meshdata()
+        vardata = self._get_vardata()
+
+        corner_lat = meshdata["cell_corner_lat"][:].data
+        ncells2D = corner_lat.shape[0]
+        lat = corner_lat.ravel()
+        lon = meshdata["cell_corner_lon"][:].data.ravel()
+
+        # Single precision is plenty for lat/lon/pressure and halves the
+        # memory of the points
+        coords = np.empty((len(lat), 3), dtype=np.float32)
+        coords[:, 0] = lon
+        coords[:, 1] = lat
+        coords[:, 2] = 0.0
+        _coords = dsa.numpyTovtkDataArray(coords)
+        vtk_coords = vtkPoints()
+        vtk_coords.SetData(_coords)
+
+        # The cells of all outputs follow the same pattern, a single set of
+        # buffers sized for the largest output is shared through slices
+        self._update_cell_buffers(ncells2D * max(1, self.levDim, self.ilevDim))
+        self._grid_cache["2D"] = (vtk_coords, self._get_cells(ncells2D))
+
+        try:
+            lev = FindSpecialVariable(
+                vardata, EAMConstants.LEV, EAMConstants.HYAM, EAMConstants.HYBM
+            )
+            if not lev is None:
+                coords3Dm = np.empty((self.levDim, len(lat), 3), dtype=np.float32)
+                coords3Dm[..., 0] = lon
+                coords3Dm[..., 1] = lat
+                coords3Dm[..., 2] = lev[:, None]
+                coords3Dm = coords3Dm.reshape(-1, 3)
+                _coords = dsa.numpyTovtkDataArray(coords3Dm)
+                vtk_coords = vtkPoints()
+                vtk_coords.SetData(_coords)
+                self._grid_cache["3Dm"] = (
+                    vtk_coords,
+                    self._get_cells(ncells2D * self.levDim),
+                    lev,
+                )
+        except Exception as e:
+            print_error("Error occurred while processing middle layer variables :", e)
+
+        try:
+            ilev = FindSpecialVariable(
+                vardata, EAMConstants.ILEV, EAMConstants.HYAI, EAMConstants.HYBI
+            )
+            if not ilev is None:
+                coords3Di = np.empty((self.ilevDim, len(lat), 3), dtype=np.float32)
+                coords3Di[..., 0] = lon
+                coords3Di[..., 1] = lat
+                coords3Di[..., 2] = ilev[:, None]
+                coords3Di = coords3Di.reshape(-1, 3)
+                _coords = dsa.numpyTovtkDataArray(coords3Di)
+                vtk_coords = vtkPoints()
+                vtk_coords.SetData(_coords)
+                self._grid_cache["3Di"] = (
+                    vtk_coords,
+                    self._get_cells(ncells2D * self.ilevDim),
+                    ilev,
+                )
+        except Exception as e:
+            print_error(
+                "Error occurred while processing interface layer variables :", e
+            )
+
     def RequestData(self, request, inInfo, outInfo):
         if (
             self._ConnFileName is None
@@ -337,177 +539,58 @@ class EAMSource(VTKPythonAlgorithmBase):
             time = timeInfo.Get(executive.UPDATE_TIME_STEP())
             timeInd = self.GetTimeIndex(time)
 
-        meshdata = netCDF4.Dataset(self._ConnFileName, "r")
-        vardata = netCDF4.Dataset(self._DataFileName, "r")
-
-        lat = meshdata["cell_corner_lat"][:].data.flatten()
-        lon = meshdata["cell_corner_lon"][:].data.flatten()
+        vardata = self._get_vardata()
+        if not self._grid_cache:
+            self._build_grids()
 
         output2D = dsa.WrapDataObject(vtkUnstructuredGrid.GetData(outInfo, 0))
         output3Dm = dsa.WrapDataObject(vtkUnstructuredGrid.GetData(outInfo, 1))
         output3Di = dsa.WrapDataObject(vtkUnstructuredGrid.GetData(outInfo, 2))
 
-        coords = np.empty((len(lat), 3), dtype=np.float64)
-        coords[:, 0] = lon
-        coords[:, 1] = lat
-        coords[:, 2] = 0.0
-        _coords = dsa.numpyTovtkDataArray(coords)
-        vtk_coords = vtkPoints()
-        vtk_coords.SetData(_coords)
+        vtk_coords, cellArray = self._grid_cache["2D"]
         output2D.SetPoints(vtk_coords)
+        # All cells are quads, VTK does not need a per-cell type array
+        output2D.VTKObject.SetCells(vtkConstants.VTK_QUAD, cellArray)
 
-        ncells2D = meshdata["cell_corner_lat"][:].data.shape[0]
-        cellTypes = np.empty(ncells2D, dtype=np.uint8)
-        offsets = np.arange(0, (4 * ncells2D) + 1, 4, dtype=np.int64)
-        cells = np.arange(ncells2D * 4, dtype=np.int64)
-        cellTypes.fill(vtkConstants.VTK_QUAD)
-        cellTypes = numpy_support.numpy_to_vtk(
-            num_array=cellTypes.ravel(),
-            deep=True,
-            array_type=vtkConstants.VTK_UNSIGNED_CHAR,
-        )
-        offsets = numpy_support.numpy_to_vtk(
-            num_array=offsets.ravel(), deep=True, array_type=vtkConstants.VTK_ID_TYPE
-        )
-        cells = numpy_support.numpy_to_vtk(
-            num_array=cells.ravel(), deep=True, array_type=vtkConstants.VTK_ID_TYPE
-        )
-        cellArray = vtkCellArray()
-        cellArray.SetData(offsets, cells)
-        output2D.VTKObject.SetCells(cellTypes, cellArray)
-
-        gridAdapter2D = dsa.WrapDataObject(output2D)
-        for varmeta in self._vars2D:
-            if self._vars2Darr.ArrayIsEnabled(varmeta.name):
-                data = vardata[varmeta.name][:].data[timeInd].flatten()
-                data = np.where(data == varmeta.fillval, np.nan, data)
-                gridAdapter2D.CellData.append(data, varmeta.name)
+        # Variables are read first, VTK arrays are only appended from the
+        # calling thread
+        enabled = [v for v in self._vars2D if self._vars2Darr.ArrayIsEnabled(v.name)]
+        for varmeta, data in zip(enabled, read_timesteps(vardata, enabled, timeInd)):
+            output2D.CellData.append(data, varmeta.name)
 
-        lev = None
         try:
-            lev = FindSpecialVariable(
-                vardata, EAMConstants.LEV, EAMConstants.HYAM, EAMConstants.HYBM
-            )
-            if not lev is None:
-                coords3Dm = np.empty((self.levDim, len(lat), 3), dtype=np.float64)
-                levInd = 0
-                for z in lev:
-                    coords = np.empty((len(lat), 3), dtype=np.float64)
-                    coords[:, 0] = lon
-                    coords[:, 1] = lat
-                    coords[:, 2] = z
-                    coords3Dm[levInd] = coords
-                    levInd = levInd + 1
-                coords3Dm = coords3Dm.flatten().reshape(self.levDim * len(lat), 3)
-                _coords = dsa.numpyTovtkDataArray(coords3Dm)
-                vtk_coords = vtkPoints()
-                vtk_coords.SetData(_coords)
+            if "3Dm" in self._grid_cache:
+                vtk_coords, cellArraym, lev = self._grid_cache["3Dm"]
                 output3Dm.SetPoints(vtk_coords)
-                cellTypesm = np.empty(ncells2D * self.levDim, dtype=np.uint8)
-                offsetsm = np.arange(
-                    0, (4 * ncells2D * self.levDim) + 1, 4, dtype=np.int64
-                )
-                cellsm = np.arange(ncells2D * self.levDim * 4, dtype=np.int64)
-                cellTypesm.fill(vtkConstants.VTK_QUAD)
-                cellTypesm = numpy_support.numpy_to_vtk(
-                    num_array=cellTypesm.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_UNSIGNED_CHAR,
-                )
-                offsetsm = numpy_support.numpy_to_vtk(
-                    num_array=offsetsm.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_ID_TYPE,
-                )
-                cellsm = numpy_support.numpy_to_vtk(
-                    num_array=cellsm.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_ID_TYPE,
-                )
-                cellArraym = vtkCellArray()
-                cellArraym.SetData(offsetsm, cellsm)
-                output3Dm.VTKObject.SetCells(cellTypesm, cellArraym)
-
-                gridAdapter3Dm = dsa.WrapDataObject(output3Dm)
-                for varmeta in self._vars3Dm:
-                    if self._vars3Dmarr.ArrayIsEnabled(varmeta.name):
-                        if not varmeta.transpose:
-                            data = vardata[varmeta.name][:].data[timeInd].flatten()
-                        else:
-                            data = (
-                                vardata[varmeta.name][:]
-                                .data[timeInd]
-                                .transpose()
-                                .flatten()
-                            )
-                        data = np.where(data == varmeta.fillval, np.nan, data)
-                        gridAdapter3Dm.CellData.append(data, varmeta.name)
-                gridAdapter3Dm.FieldData.append(self.levDim, "numlev")
-                gridAdapter3Dm.FieldData.append(lev, "lev")
+                output3Dm.VTKObject.SetCells(vtkConstants.VTK_QUAD, cellArraym)
+
+                enabled = [
+                    v for v in self._vars3Dm if self._vars3Dmarr.ArrayIsEnabled(v.name)
+                ]
+                for varmeta, data in zip(
+                    enabled, read_timesteps(vardata, enabled, timeInd)
+                ):
+                    output3Dm.CellData.append(data, varmeta.name)
+                output3Dm.FieldData.append(self.levDim, "numlev")
+                output3Dm.FieldData.append(lev, "lev")
         except Exception as e:
             print_error("Error occurred while processing middle layer variables :", e)
 
-        ilev = None
         try:
-            ilev = FindSpecialVariable(
-                vardata, EAMConstants.ILEV, EAMConstants.HYAI, EAMConstants.HYBI
-            )
-            if not ilev is None:
-                coords3Di = np.empty((self.ilevDim, len(lat), 3), dtype=np.float64)
-                ilevInd = 0
-                for z in ilev:
-                    coords = np.empty((len(lat), 3), dtype=np.float64)
-                    coords[:, 0] = lon
-                    coords[:, 1] = lat
-                    coords[:, 2] = z
-                    coords3Di[ilevInd] = coords
-                    ilevInd = ilevInd + 1
-                coords3Di = coords3Di.flatten().reshape(self.ilevDim * len(lat), 3)
-                _coords = dsa.numpyTovtkDataArray(coords3Di)
-                vtk_coords = vtkPoints()
-                vtk_coords.SetData(_coords)
+            if "3Di" in self._grid_cache:
+                vtk_coords, cellArrayi, ilev = self._grid_cache["3Di"]
                 output3Di.SetPoints(vtk_coords)
-                cellTypesi = np.empty(ncells2D * self.ilevDim, dtype=np.uint8)
-                offsetsi = np.arange(
-                    0, (4 * ncells2D * self.ilevDim) + 1, 4, dtype=np.int64
-                )
-                cellsi = np.arange(ncells2D * self.ilevDim * 4, dtype=np.int64)
-                cellTypesi.fill(vtkConstants.VTK_QUAD)
-                cellTypesi = numpy_support.numpy_to_vtk(
-                    num_array=cellTypesi.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_UNSIGNED_CHAR,
-                )
-                offsetsi = numpy_support.numpy_to_vtk(
-                    num_array=offsetsi.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_ID_TYPE,
-                )
-                cellsi = numpy_support.numpy_to_vtk(
-                    num_array=cellsi.ravel(),
-                    deep=True,
-                    array_type=vtkConstants.VTK_ID_TYPE,
-                )
-                cellArrayi = vtkCellArray()
-                cellArrayi.SetData(offsetsi, cellsi)
-                output3Di.VTKObject.SetCells(cellTypesi, cellArrayi)
-
-                gridAdapter3Di = dsa.WrapDataObject(output3Di)
-                for varmeta in self._vars3Di:
-                    if self._vars3Diarr.ArrayIsEnabled(varmeta.name):
-                        if not varmeta.transpose:
-                            data = vardata[varmeta.name][:].data[timeInd].flatten()
-                        else:
-                            data = (
-                                vardata[varmeta.name][:]
-                                .data[timeInd]
-                                .transpose()
-                                .flatten()
-                            )
-                        data = np.where(data == varmeta.fillval, np.nan, data)
-                        gridAdapter3Di.CellData.append(data, varmeta.name)
-                gridAdapter3Di.FieldData.append(self.ilevDim, "numilev")
-                gridAdapter3Di.FieldData.append(ilev, "ilev")
+                output3Di.VTKObject.SetCells(vtkConstants.VTK_QUAD, cellArrayi)
+
+                enabled = [
+                    v for v in self._vars3Di if self._vars3Diarr.ArrayIsEnabled(v.name)
+                ]
+                for varmeta, data in zip(
+                    enabled, read_timesteps(vardata, enabled, timeInd)
+                ):
+                    output3Di.CellData.append(data, varmeta.name)
+                output3Di.FieldData.append(self.ilevDim, "numilev")
+                output3Di.FieldData.append(ilev, "ilev")
         except Exception as e:
             print_error(
                 "Error occurred while processing interface layer variables :", e
@@ -575,7 +658,25 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
 
         self._DataFileName = None
         self._ConnFileName = None
+        self._vardata = None
+        self._meshdata = None
         self._dirty = False
+        # Points and cells of the output, built once per connectivity file
+        self._topology_built = False
+        self._points = vtkPoints()
+        self._topology = None
+        # Numpy buffers backing the cell arrays of the output
+        self._keep_alive = []
+        # Numpy buffers and the VTK arrays wrapping them, by array name
+        self._vtk_arrays = {}
+        # Fill-masked slices keyed by (name, timeInd, level) so toggling
+        # variables or revisiting a level or timestep does not read and mask
+        # the data again
+        self._slice_cache = {}
+        # Names of the variables enabled during the last request
+        self._last_enabled = None
+        # Enabled variables, rebuilt when a selection array is modified
+        self._enabled = None
         self._2d_update = True
         self._lev_update = True
         self._ilev_update = True
@@ -590,6 +691,7 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
         self._vars3Di = []
         self._vars3Dm = []
         self._timeSteps = []
+        self._timeStepsArr = []
 
         # vtkDataArraySelection to allow users choice for fields
         # to fetch from the netCDF data set
@@ -605,8 +707,96 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
         self._vars2Darr.AddObserver("ModifiedEvent", createModifiedCallback(self))
         self._vars3Diarr.AddObserver("ModifiedEvent", createModifiedCallback(self))
         self._vars3Dmarr.AddObserver("ModifiedEvent", createModifiedCallback(self))
+        self._vars2Darr.AddObserver("ModifiedEvent", createSelectionCallback(self))
+        self._vars3Diarr.AddObserver("ModifiedEvent", createSelectionCallback(self))
+        self._vars3Dmarr.AddObserver("ModifiedEvent", createSelectionCallback(self))
         # Flag for area var to calculate averages
         self._areavar = None
+        self._area_cache = None
+
+    # Dataset handles are kept open across requests and closed when
+    # either file changes
+    def _get_vardata(self):
+        if self._vardata is None:
+            self._vardata = netCDF4.Dataset(self._DataFileName, "r")
+            # Fill values are masked by netCDF4 while decoding
+            self._vardata.set_auto_mask(True)
+        return self._vardata
+
+    def _get_meshdata(self):
+        if self._meshdata is None:
+            self._meshdata = netCDF4.Dataset(self._ConnFileName, "r")
+        return self._meshdata
+
+    def _close(self):
+        if self._vardata is not None:
+            self._vardata.close()
+            self._vardata = None
+        if self._meshdata is not None:
+            self._meshdata.close()
+            self._meshdata = None
+
+    def __del__(self):
+        self._close()
+
+    def _set_cell_array(self, output, data, name):
+        # Each variable keeps one VTK array while it stays on the output, new
+        # values are copied into the numpy buffer VTK points at
+        entry = self._vtk_arrays.get(name)
+        if (
+            entry is not None
+            and entry[0].shape == data.shape
+            and entry[0].dtype == data.dtype
+        ):
+            buf, arr = entry
+            np.copyto(buf, data)
+            arr.Modified()
+            return
+        # Cached slices are shared, the array gets a buffer of its own
+        buf = np.array(data, order="C")
+        arr = numpy_support.numpy_to_vtk(num_array=buf, deep=False)
+        arr.SetName(name)
+        output.VTKObject.GetCellData().AddArray(arr)
+        self._vtk_arrays[name] = (buf, arr)
+
+    def _read_slice(self, vardata, varmeta, timeInd, lev=None):
+        key = (varmeta.name, timeInd, lev)
+        data = self._slice_cache.get(key)
+        if data is not None:
+            return data
+        # Only the selected level is read from the file
+        var = vardata[varmeta.name]
+        if lev is None:
+            data = var[timeInd]
+        elif not varmeta.transpose:
+            data = var[timeInd, lev, :]
+        else:
+            data = var[timeInd, :, lev]
+        data = fill_masked(data).ravel()
+        if SLICE_CACHE_SIZE <= 0:
+            return data
+        if len(self._slice_cache) >= SLICE_CACHE_SIZE:
+            del self._slice_cache[next(iter(self._slice_cache))]
+        self._slice_cache[key] = data
+        return data
+
+    def _get_enabled(self):
+        if self._enabled is None:
+            # A single list over all kinds of variables, RequestData
+            # dispatches on the variable type
+            varmetas = [
+                varmeta
+                for varlist, arr in (
+                    (self._vars2D, self._vars2Darr),
+                    (self._vars3Dm, self._vars3Dmarr),
+                    (self._vars3Di, self._vars3Diarr),
+                )
+                for varmeta in varlist
+                if arr.ArrayIsEnabled(varmeta.name)
+            ]
+            names = frozenset(varmeta.name for varmeta in varmetas)
+            self._enabled = (names, varmetas)
+        return self._enabled
 
     # Method to clear all the variable names
     def _clear(self):
@@ -614,11 +804,16 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
         self._vars2D.clear()
         self._vars3Di.clear()
         self._vars3Dm.clear()
+        self._timeSteps.clear()
+        self._slice_cache.clear()
+        self._enabled = None
+        self._areavar = None
+        self._area_cache = None
 
     def _populate_variable_metadata(self):
         if self._DataFileName is None:
             return
-        vardata = netCDF4.Dataset(self._DataFileName, "r")
+        vardata = self._get_vardata()
         for name, info in vardata.variables.items():
             dims = set(info.dimensions)
             if not (dims == dims1 or dims == dims2 or dims == dims3m or dims == dims3i):
@@ -634,24 +829,23 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
             elif varmeta.type == VarType._3Dm:
                 self._vars3Dm.append(varmeta)
                 self._vars3Dmarr.AddArray(name)
+                set_var_chunk_cache(info)
             elif varmeta.type == VarType._3Di:
                 self._vars3Di.append(varmeta)
                 self._vars3Diarr.AddArray(name)
-            try:
-                fillval = info.getncattr("_FillValue")
-                varmeta.fillval = fillval
-            except Exception as e:
-                pass
+                set_var_chunk_cache(info)
         self._vars2Darr.DisableAllArrays()
         self._vars3Diarr.DisableAllArrays()
         self._vars3Dmarr.DisableAllArrays()
 
         timesteps = vardata["time"][:].data.flatten()
         self._timeSteps.extend(timesteps)
+        self._timeStepsArr = np.asarray(self._timeSteps)
 
     def SetDataFileName(self, fname):
         if fname is not None and fname != "None":
             if fname != self._DataFileName:
+                self._close()
                 self._DataFileName = fname
                 self._dirty = True
                 self._2d_update = True
@@ -663,8 +857,10 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
 
     def SetConnFileName(self, fname):
         if fname != self._ConnFileName:
+            self._close()
             self._ConnFileName = fname
             self._dirty = True
+            self._topology_built = False
             self._2d_update = True
             self._lev_update = True
             self._ilev_update = True
@@ -728,16 +924,11 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
 
     def get_time_index(self, outInfo, executive, from_port):
         timeInfo = outInfo.GetInformationObject(from_port)
-        timeInd = 0
-        if timeInfo.Has(executive.UPDATE_TIME_STEP()) and len(self._timeSteps) > 1:
+        nsteps = len(self._timeStepsArr)
+        if timeInfo.Has(executive.UPDATE_TIME_STEP()) and nsteps > 1:
             time = timeInfo.Get(executive.UPDATE_TIME_STEP())
-            for t in self._timeSteps:
-                if time <= t:
-                    break
-                else:
-                    timeInd = timeInd + 1
-            return timeInd
-        return timeInd
+            return min(int(np.searchsorted(self._timeStepsArr, time)), nsteps - 1)
+        return 0
 
     def RequestData(self, request, inInfo, outInfo):
         if (
@@ -765,78 +956,73 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
             self._lev_update = True
             self._ilev_update = True
 
-        meshdata = netCDF4.Dataset(self._ConnFileName, "r")
-        vardata = netCDF4.Dataset(self._DataFileName, "r")
+        # Nothing to re-read or drop when the same variables are enabled and
+        # neither the grid, time nor levels changed
+        enabled, enabled_vars = self._get_enabled()
+        if (
+            enabled == self._last_enabled
+            and not self._dirty
+            and not (self._2d_update or self._lev_update or self._ilev_update)
+        ):
+            output = vtkUnstructuredGrid.GetData(outInfo, 0)
+            output.ShallowCopy(self._output)
+            return 1
+        self._last_enabled = enabled
+
+        meshdata = self._get_meshdata()
+        vardata = self._get_vardata()
 
         output2D = dsa.WrapDataObject(self._output)
         dims = meshdata.dimensions
-        mdims = np.array(list(meshdata.dimensions.keys()))
-        mvars = np.array(list(meshdata.variables.keys()))
-        ncells2D = dims[
-            mdims[
-                np.where(
-                    (np.char.find(mdims, "grid_size") > -1)
-                    | (np.char.find(mdims, "ncol") > -1)
-                )[0][0]
-            ]
-        ].size
-        if self._dirty:
-            self._output = vtkUnstructuredGrid()
-            output2D = dsa.WrapDataObject(self._output)
-
-            latdim = mvars[np.where(np.char.find(mvars, "corner_lat") > -1)][0]
-            londim = mvars[np.where(np.char.find(mvars, "corner_lon") > -1)][0]
+        mvars = meshdata.variables
+        ncells2D = dims[next(n for n in dims if "grid_size" in n or "ncol" in n)].size
+        if not self._topology_built:
+            latdim = next(n for n in mvars if "corner_lat" in n)
+            londim = next(n for n in mvars if "corner_lon" in n)
 
             lat = meshdata[latdim][:].data.flatten()
             lon = meshdata[londim][:].data.flatten()
 
-            coords = np.empty((len(lat), 3), dtype=np.float64)
+            coords = np.empty((len(lat), 3), dtype=np.float32)
             coords[:, 0] = lon
             coords[:, 1] = lat
             coords[:, 2] = 0.0
-            _coords = dsa.numpyTovtkDataArray(coords)
-            vtk_coords = vtkPoints()
-            vtk_coords.SetData(_coords)
-            output2D.SetPoints(vtk_coords)
-
-            cellTypes = np.empty(ncells2D, dtype=np.uint8)
-            offsets = np.arange(0, (4 * ncells2D) + 1, 4, dtype=np.int64)
-            cells = np.arange(ncells2D * 4, dtype=np.int64)
-            cellTypes.fill(vtkConstants.VTK_QUAD)
-            cellTypes = numpy_support.numpy_to_vtk(
-                num_array=cellTypes.ravel(),
-                deep=True,
-                array_type=vtkConstants.VTK_UNSIGNED_CHAR,
-            )
-            offsets = numpy_support.numpy_to_vtk(
-                num_array=offsets.ravel(),
-                deep=True,
-                array_type=vtkConstants.VTK_ID_TYPE,
-            )
-            cells = numpy_support.numpy_to_vtk(
-                num_array=cells.ravel(), deep=True, array_type=vtkConstants.VTK_ID_TYPE
-            )
+            # The points object is kept so its identity survives rebuilds
+            self._points.SetData(dsa.numpyTovtkDataArray(coords))
+            self._points.Modified()
+
+            idtype = numpy_support.ID_TYPE_CODE
+            offsets = np.arange(ncells2D + 1, dtype=idtype)
+            offsets *= 4
+            cells = np.arange(ncells2D * 4, dtype=idtype)
+            # VTK wraps these buffers without a copy, they are released when
+            # the grid is rebuilt
+            self._keep_alive = [offsets, cells]
+            offsets = numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=False)
+            cells = numpy_support.numpy_to_vtkIdTypeArray(cells, deep=False)
             cellArray = vtkCellArray()
             cellArray.SetData(offsets, cells)
-            output2D.VTKObject.SetCells(cellTypes, cellArray)
+            self._topology = cellArray
+            self._topology_built = True
 
+        # A new output drops the arrays of the previous data file, the points
+        # and cells only depend on the connectivity file and are reused
+        if self._dirty:
+            self._output = vtkUnstructuredGrid()
+            self._vtk_arrays.clear()
+            output2D = dsa.WrapDataObject(self._output)
+            output2D.SetPoints(self._points)
+            # All cells are quads, VTK does not need a per-cell type array
+            output2D.VTKObject.SetCells(vtkConstants.VTK_QUAD, self._topology)
             self._dirty = False
 
-        # Needed to drop arrays from cached VTK Object
-        to_remove = set()
-        last_num_arrays = output2D.CellData.GetNumberOfArrays()
-        for i in range(last_num_arrays):
-            to_remove.add(output2D.CellData.GetArrayName(i))
-
-        for varmeta in self._vars2D:
-            if self._vars2Darr.ArrayIsEnabled(varmeta.name):
-                if output2D.CellData.HasArray(varmeta.name):
-                    to_remove.remove(varmeta.name)
-                if not output2D.CellData.HasArray(varmeta.name) or self._2d_update:
-                    data = vardata[varmeta.name][:].data[timeInd].flatten()
-                    data = np.where(data == varmeta.fillval, np.nan, data)
-                    output2D.CellData.append(data, varmeta.name)
-        self._2d_update = False
+        # Needed to drop arrays from cached VTK Object, all cell arrays are
+        # tracked in _vtk_arrays
+        to_remove = set(self._vtk_arrays) - enabled
+
+        # Level and update flag for each kind of variable, 3D variables are
+        # skipped when their vertical coordinate is missing
+        slices = {VarType._2D: (None, self._2d_update)}
 
         try:
             lev_field_name = "lev"
@@ -855,33 +1041,7 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
                     print_error(
                         f"User provided input for middle layer {self._lev} larger than actual data {len(lev) - 1}"
                     )
-                lstart = self._lev * ncells2D
-                lend = lstart + ncells2D
-
-                for varmeta in self._vars3Dm:
-                    if self._vars3Dmarr.ArrayIsEnabled(varmeta.name):
-                        if output2D.CellData.HasArray(varmeta.name):
-                            to_remove.remove(varmeta.name)
-                        if (
-                            not output2D.CellData.HasArray(varmeta.name)
-                            or self._lev_update
-                        ):
-                            if not varmeta.transpose:
-                                data = (
-                                    vardata[varmeta.name][:]
-                                    .data[timeInd]
-                                    .flatten()[lstart:lend]
-                                )
-                            else:
-                                data = (
-                                    vardata[varmeta.name][:]
-                                    .data[timeInd]
-                                    .transpose()
-                                    .flatten()[lstart:lend]
-                                )
-                            data = np.where(data == varmeta.fillval, np.nan, data)
-                            output2D.CellData.append(data, varmeta.name)
-            self._lev_update = False
+                slices[VarType._3Dm] = (self._lev, self._lev_update)
         except Exception as e:
             print_error("Error occurred while processing middle layer variables :", e)
             traceback.print_exc()
@@ -899,48 +1059,41 @@ class EAMSliceSource(VTKPythonAlgorithmBase):
                     print_error(
                         f"User provided input for middle layer {self._ilev} larger than actual data {len(ilev) - 1}"
                     )
-                ilstart = self._ilev * ncells2D
-                ilend = ilstart + ncells2D
-                for varmeta in self._vars3Di:
-                    if self._vars3Diarr.ArrayIsEnabled(varmeta.name):
-                        if output2D.CellData.HasArray(varmeta.name):
-                            to_remove.remove(varmeta.name)
-                        if (
-                            not output2D.CellData.HasArray(varmeta.name)
-                            or self._ilev_update
-                        ):
-                            if not varmeta.transpose:
-                                data = (
-                                    vardata[varmeta.name][:]
-                                    .data[timeInd]
-                                    .flatten()[ilstart:ilend]
-                                )
-                            else:
-                                data = (
-                                    vardata[varmeta.name][:]
-                                    .data[timeInd]
-                                    .transpose()
-                                    .flatten()[ilstart:ilend]
-                                )
-                            data = np.where(data == varmeta.fillval, np.nan, data)
-                            output2D.CellData.append(data, varmeta.name)
-            self._ilev_update = False
+                slices[VarType._3Di] = (self._ilev, self._ilev_update)
         except Exception as e:
             print_error(
                 "Error occurred while processing interface layer variables :", e
             )
             traceback.print_exc()
 
+        for varmeta in enabled_vars:
+            if varmeta.type not in slices:
+                continue
+            level, update = slices[varmeta.type]
+            if varmeta.name in self._vtk_arrays and not update:
+                continue
+            try:
+                data = self._read_slice(vardata, varmeta, timeInd, level)
+                self._set_cell_array(output2D, data, varmeta.name)
+            except Exception as e:
+                print_error(f"Error occurred while processing {varmeta.name} :", e)
+                traceback.print_exc()
+        self._2d_update = False
+        self._lev_update = False
+        self._ilev_update = False
+
         area_var_name = "area"
-        if self._areavar and not output2D.CellData.HasArray(area_var_name):
-            data = vardata[self._areavar.name][:].data.flatten()
-            data = np.where(data == self._areavar.fillval, np.nan, data)
-            output2D.CellData.append(data, area_var_name)
-        if area_var_name in to_remove:
-            to_remove.remove(area_var_name)
+        if self._areavar and area_var_name not in self._vtk_arrays:
+            # Area is time invariant, it is read once per data file
+            if self._area_cache is None:
+                data = vardata[self._areavar.name][:]
+                self._area_cache = fill_masked(data).ravel()
+            self._set_cell_array(output2D, self._area_cache, area_var_name)
+        to_remove.discard(area_var_name)
 
         for var_name in to_remove:
             output2D.CellData.RemoveArray(var_name)
+            self._vtk_arrays.pop(var_name, None)
 
         output = vtkUnstructuredGrid.GetData(outInfo, 0)
         output.ShallowCopy(self._output)
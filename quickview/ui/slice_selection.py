@@ -17,6 +17,10 @@ class SliceSelection(CollapsableSection):
 
         self.source = source
         self.views = view_manager
+        self._pending_update = None
+        # Set once a pipeline update has been pushed to the views, playback
+        # waits on it before advancing
+        self._frame_done = asyncio.Event()
 
         style = dict(dense=True, hide_details=True)
         with self.content:
@@ -215,6 +219,26 @@ class SliceSelection(CollapsableSection):
 
     @change("vlev", "vilev", "tstamp", "cliplat", "cliplong")
     def update_pipeline_interactive(self, **kwargs):
+        # Slider drags fire many changes, only the last one within the
+        # debounce window updates the pipeline
+        if self._pending_update is not None:
+            self._pending_update.cancel()
+        self._pending_update = asynchronous.create_task(self._debounced_update())
+
+    async def _debounced_update(self):
+        await asyncio.sleep(0.05)
+        self._pending_update = None
+        with self.state:
+            self.update_pipeline()
+        self._frame_done.set()
+
+    async def wait_for_frame(self):
+        try:
+            await asyncio.wait_for(self._frame_done.wait(), timeout=0.25)
+        except asyncio.TimeoutError:
+            pass
+
+    def update_pipeline(self):
         lev = self.state.vlev
         ilev = self.state.vilev
         tstamp = self.state.tstamp
@@ -240,9 +264,10 @@ class SliceSelection(CollapsableSection):
         while state.play_lev:
             state.play_ilev = False
             state.play_time = False
+            self._frame_done.clear()
             with state:
                 self.on_click_advance_middle(1)
-                await asyncio.sleep(0.1)
+            await self.wait_for_frame()
 
     def on_click_advance_interface(self, diff):
         current = self.state.vilev
@@ -257,9 +282,10 @@ class SliceSelection(CollapsableSection):
         while state.play_ilev:
             state.play_lev = False
             state.play_time = False
+            self._frame_done.clear()
             with state:
                 self.on_click_advance_interface(1)
-                await asyncio.sleep(0.1)
+            await self.wait_for_frame()
 
     def on_click_advance_time(self, diff):
         current = self.state.tstamp
@@ -274,6 +300,7 @@ class SliceSelection(CollapsableSection):
         while state.play_time:
             state.play_lev = False
             state.play_ilev = False
+            self._frame_done.clear()
             with state:
                 self.on_click_advance_time(1)
-                await asyncio.sleep(0.1)
+            await self.wait_for_frame()
@@ -78,6 +78,8 @@ class Toolbar:
                 tonal=True,
                 small=True,
                 click=load_variables,
+                loading=("loading_vars", False),
+                disabled=("loading_vars", False),
                 style="background-color: lightgray;",  # width: 200px; height: 50px;",
             )
             v2.VSpacer()